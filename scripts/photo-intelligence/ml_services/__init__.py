@@ -3,24 +3,36 @@ ML services for photo intelligence pipeline.
 """
 
 from .face_detection import detect_faces, get_face_embeddings
-from .person_detection import detect_persons
-from .perceptual_hash import compute_hashes, hamming_distance, are_similar
-from .image_embeddings import get_image_embedding, cosine_similarity
-from .face_embeddings import get_face_encodings_for_photo, face_distance, faces_match
+from .person_detection import detect_persons, detect_persons_batch
+from .perceptual_hash import compute_hashes, hamming_distance, hamming_matrix, hamming_block, are_similar
+from .perceptual_hash_fast import are_similar_batch
+from .image_embeddings import get_image_embedding, get_image_embeddings_batch, cosine_similarity, cosine_similarity_matrix
+from .face_embeddings import get_face_encodings_for_photo, encode_embedding, decode_embedding, face_distance_sq, face_distance, face_distance_matrix, faces_match, faces_match_matrix
 from .crop_calculator import calculate_smart_crop
 
 __all__ = [
     "detect_faces",
     "get_face_embeddings",
     "detect_persons",
+    "detect_persons_batch",
     "compute_hashes",
     "hamming_distance",
+    "hamming_matrix",
+    "hamming_block",
     "are_similar",
+    "are_similar_batch",
     "get_image_embedding",
+    "get_image_embeddings_batch",
     "cosine_similarity",
+    "cosine_similarity_matrix",
     "get_face_encodings_for_photo",
+    "encode_embedding",
+    "decode_embedding",
+    "face_distance_sq",
     "face_distance",
+    "face_distance_matrix",
     "faces_match",
+    "faces_match_matrix",
     "calculate_smart_crop",
 ]
 
@@ -0,0 +1,32 @@
+"""
+Worker setup for running the per-photo ML services in a process pool
+(see pipeline.main), with models loaded once per worker.
+"""
+
+import os
+import sys
+
+from .face_detection import MEDIAPIPE_AVAILABLE, _get_mp_detector
+from .image_embeddings import _get_model as _get_clip_model
+
+
+def warm_models(skip_faces: bool = False, load_clip: bool = True) -> None:
+    """
+    Load models once in the current (worker) process.
+
+    Use as a ProcessPoolExecutor initializer so every photo handled by the
+    worker reuses the same model instances.
+
+    Args:
+        skip_faces: Don't load face detection models
+        load_clip: Load the CLIP model (skip when CLIP runs in the parent)
+    """
+    try:
+        if load_clip:
+            _get_clip_model()
+        if not skip_faces and MEDIAPIPE_AVAILABLE:
+            _get_mp_detector()
+        # face_recognition loads its dlib models at import time
+    except Exception as e:
+        print(f"Error warming models in worker {os.getpid()}: {e}", file=sys.stderr)
+
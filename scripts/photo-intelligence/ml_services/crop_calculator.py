@@ -58,7 +58,13 @@ def calculate_smart_crop(
     
     # Strategy 1: Use faces (highest priority)
     if faces:
-        best_face = max(faces, key=lambda f: f.get("quality_score", 0) * f.get("confidence", 0))
+        # Face boxes as one (N, 4) array of x, y, width, height
+        boxes = np.array(
+            [[f["box"]["x"], f["box"]["y"], f["box"]["width"], f["box"]["height"]] for f in faces],
+            dtype=np.int32
+        )
+        scores = np.array([f.get("quality_score", 0) * f.get("confidence", 0) for f in faces])
+        best_face = faces[int(scores.argmax())]
         face_box = best_face["box"]
         
         # Calculate crop centered on face with headroom
@@ -75,15 +81,8 @@ def calculate_smart_crop(
         
         # If multiple faces, adjust to include nearby faces
         if len(faces) > 1:
-            all_face_x = [f["box"]["x"] for f in faces]
-            all_face_y = [f["box"]["y"] for f in faces]
-            all_face_right = [f["box"]["x"] + f["box"]["width"] for f in faces]
-            all_face_bottom = [f["box"]["y"] + f["box"]["height"] for f in faces]
-            
-            min_x = min(all_face_x)
-            max_x = max(all_face_right)
-            min_y = min(all_face_y)
-            max_y = max(all_face_bottom)
+            min_x, min_y = boxes[:, :2].min(axis=0).tolist()
+            max_x, max_y = (boxes[:, :2] + boxes[:, 2:]).max(axis=0).tolist()
             
             # Calculate group center
             group_center_x = (min_x + max_x) / 2
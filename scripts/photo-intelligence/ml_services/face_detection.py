@@ -3,34 +3,43 @@ Face detection using face_recognition library (dlib backend) or MediaPipe fallba
 Detects faces and returns bounding boxes with confidence scores.
 """
 
+import importlib.util
+import os
+import sys
+import threading
+from math import hypot
+
 try:
     import face_recognition
     FACE_RECOGNITION_AVAILABLE = True
 except ImportError:
     FACE_RECOGNITION_AVAILABLE = False
 
-# Configure matplotlib to use non-interactive backend before any imports
-# This prevents slow font scanning when MediaPipe imports matplotlib
-import os
-os.environ['MPLBACKEND'] = 'Agg'
-
-try:
-    import mediapipe as mp
-    MEDIAPIPE_AVAILABLE = True
-except ImportError:
-    MEDIAPIPE_AVAILABLE = False
+# MediaPipe (TFLite, protobuf, matplotlib) takes seconds to import, so only
+# probe for it here and import it on first use in _get_mp_detector
+MEDIAPIPE_AVAILABLE = importlib.util.find_spec("mediapipe") is not None
 
 import numpy as np
-from PIL import Image
 from typing import List, Dict, Tuple, Optional
-import os
-import sys
+
+from .image_io import load_image_array
+from .result_cache import cached_by_file, decode_json, encode_json
+
+
+# Face area fraction mapped to a 0-1 area score (faces are typically 5-30% of image)
+FACE_AREA_MIN_FRACTION = 0.05
+FACE_AREA_RANGE = 0.25
+
+
+# MediaPipe detectors aren't thread-safe, so keep one per thread (lazy loaded)
+_mp_local = threading.local()
 
 
 def detect_faces(
     image_path: str,
     model: str = "hog",
-    num_jitters: int = 1
+    num_jitters: int = 1,
+    image: Optional[np.ndarray] = None
 ) -> List[Dict[str, any]]:
     """
     Detect faces in an image.
@@ -39,18 +48,34 @@ def detect_faces(
         image_path: Path to image file
         model: "hog" (faster, CPU) or "cnn" (more accurate, GPU)
         num_jitters: Number of times to re-sample face for encoding (higher = more accurate but slower)
+        image: Optional pre-decoded RGB array (skips loading image_path)
     
     Returns:
         List of face detections, each with:
         - box: (top, right, bottom, left) in pixels
         - confidence: Detection confidence (1.0 for face_recognition)
         - landmarks: 68-point facial landmarks (optional)
+        - _face_location: (top, right, bottom, left) as face_recognition expects (internal)
+        Empty if no faces were found or detection failed.
     """
+    faces = _detect_faces(image_path, model, num_jitters, image=image)
+    return faces if faces is not None else []
+
+
+@cached_by_file("faces_v3", encode_json, decode_json, should_cache=lambda faces: faces is not None)
+def _detect_faces(
+    image_path: str,
+    model: str = "hog",
+    num_jitters: int = 1,
+    image: Optional[np.ndarray] = None
+) -> Optional[List[Dict[str, any]]]:
+    """Detect faces (see detect_faces), returning None if detection failed so it isn't cached."""
     # Try face_recognition first, fallback to MediaPipe
     if FACE_RECOGNITION_AVAILABLE:
         try:
-            # Load image
-            image = face_recognition.load_image_file(image_path)
+            # Load image (unless already decoded by the caller)
+            if image is None:
+                image = face_recognition.load_image_file(image_path)
             
             # Detect face locations
             face_locations = face_recognition.face_locations(
@@ -63,49 +88,45 @@ def detect_faces(
                 # Get face landmarks for quality assessment
                 face_landmarks_list = face_recognition.face_landmarks(image, face_locations)
                 
+                # Calculate quality scores for all faces at once
+                # Larger, more central faces score higher
+                img_height, img_width = image.shape[:2]
+                top, right, bottom, left = np.array(face_locations, dtype=np.float64).T
+                face_width = right - left
+                face_height = bottom - top
+                
+                # Normalize face area (0-1, assuming faces are typically 5-30% of image)
+                area_fraction = face_width * face_height / (img_width * img_height)
+                area_score = np.clip((area_fraction - FACE_AREA_MIN_FRACTION) / FACE_AREA_RANGE, 0.0, 1.0)
+                
+                distance_from_center = np.hypot(
+                    (left + right) * (0.5 / img_width) - 0.5,
+                    (top + bottom) * (0.5 / img_height) - 0.5
+                )
+                
+                # Quality score: area (70%) + centrality (30%)
+                quality_scores = area_score * 0.7 + (1.0 - np.minimum(1.0, distance_from_center)) * 0.3
+                
                 results = []
                 for i, (top, right, bottom, left) in enumerate(face_locations):
-                    # Calculate face size and position
-                    face_width = right - left
-                    face_height = bottom - top
-                    face_area = face_width * face_height
-                    
-                    # Get landmarks for this face
-                    landmarks = face_landmarks_list[i] if i < len(face_landmarks_list) else {}
-                    
-                    # Calculate quality score based on size and position
-                    # Larger, more central faces score higher
-                    img_height, img_width = image.shape[:2]
-                    center_x = (left + right) / 2
-                    center_y = (top + bottom) / 2
-                    distance_from_center = np.sqrt(
-                        ((center_x - img_width / 2) / img_width) ** 2 +
-                        ((center_y - img_height / 2) / img_height) ** 2
-                    )
-                    
-                    # Normalize face area (0-1, assuming faces are typically 5-30% of image)
-                    area_score = min(1.0, max(0.0, (face_area / (img_width * img_height) - 0.05) / 0.25))
-                    
-                    # Quality score: area (70%) + centrality (30%)
-                    quality_score = area_score * 0.7 + (1.0 - min(1.0, distance_from_center)) * 0.3
-                    
                     results.append({
                         "box": {
                             "x": int(left),
                             "y": int(top),
-                            "width": int(face_width),
-                            "height": int(face_height)
+                            "width": int(right - left),
+                            "height": int(bottom - top)
                         },
                         "confidence": 1.0,  # face_recognition doesn't provide confidence
-                        "quality_score": float(quality_score),
-                        "landmarks": landmarks
+                        "quality_score": float(quality_scores[i]),
+                        "landmarks": face_landmarks_list[i] if i < len(face_landmarks_list) else {},
+                        "_face_location": (int(top), int(right), int(bottom), int(left))
                     })
                 
                 return results
             else:
                 # No faces found with face_recognition, try MediaPipe
                 if MEDIAPIPE_AVAILABLE:
-                    return _detect_faces_mediapipe(image_path)
+                    return _detect_faces_mediapipe(image_path, image)
                 return []
         except Exception as e:
             print(f"face_recognition failed for {os.path.basename(image_path)}: {e}, trying MediaPipe", file=sys.stderr)
@@ -113,16 +134,17 @@ def detect_faces(
     
     # Fallback to MediaPipe if face_recognition not available
     if MEDIAPIPE_AVAILABLE:
-        return _detect_faces_mediapipe(image_path)
+        return _detect_faces_mediapipe(image_path, image)
     else:
         print(f"Warning: No face detection library available for {os.path.basename(image_path)}", file=sys.stderr)
-        return []
+        return None
 
 
 def get_face_embeddings(
     image_path: str,
     face_locations: Optional[List[Tuple[int, int, int, int]]] = None,
-    num_jitters: int = 1
+    num_jitters: int = 1,
+    image: Optional[np.ndarray] = None
 ) -> List[np.ndarray]:
     """
     Get face embeddings (128-dimensional vectors) for face recognition.
@@ -131,6 +153,7 @@ def get_face_embeddings(
         image_path: Path to image file
         face_locations: Optional pre-computed face locations
         num_jitters: Number of times to re-sample face (higher = more accurate)
+        image: Optional pre-decoded RGB array (skips loading image_path)
     
     Returns:
         List of 128-dimensional numpy arrays (one per face)
@@ -139,7 +162,8 @@ def get_face_embeddings(
         return []
     
     try:
-        image = face_recognition.load_image_file(image_path)
+        if image is None:
+            image = face_recognition.load_image_file(image_path)
         
         if face_locations is None:
             face_locations = face_recognition.face_locations(image)
@@ -158,12 +182,20 @@ def get_face_embeddings(
         return []
 
 
-def _detect_faces_mediapipe(image_path: str) -> List[Dict[str, any]]:
-    """Fallback face detection using MediaPipe v0.10+."""
-    try:
+def _get_mp_detector():
+    """
+    Lazy load the MediaPipe FaceDetector (one per thread, reused across images).
+    
+    Returns:
+        FaceDetector, or None if the model file is missing
+    """
+    detector = getattr(_mp_local, "detector", None)
+    if detector is None:
+        # Use non-interactive matplotlib backend (unless the user chose one)
+        # to prevent slow font scanning when MediaPipe imports matplotlib
+        os.environ.setdefault('MPLBACKEND', 'Agg')
         from mediapipe.tasks import python
         from mediapipe.tasks.python import vision
-        from mediapipe.tasks.python.vision.core import image as mp_image
         
         # Get path to model file (relative to this script's directory)
         script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -172,17 +204,27 @@ def _detect_faces_mediapipe(image_path: str) -> List[Dict[str, any]]:
         
         if not os.path.exists(model_path):
             print(f"Warning: MediaPipe model not found at {model_path}, skipping face detection", file=sys.stderr)
-            return []
+            return None
         
         # Create FaceDetector with model file
         base_options = python.BaseOptions(model_asset_path=model_path)
         options = vision.FaceDetectorOptions(base_options=base_options, min_detection_confidence=0.5)
         detector = vision.FaceDetector.create_from_options(options)
+        _mp_local.detector = detector
+    return detector
+
+
+def _detect_faces_mediapipe(image_path: str, image: Optional[np.ndarray] = None) -> Optional[List[Dict[str, any]]]:
+    """Fallback face detection using MediaPipe v0.10+ (None if it couldn't run)."""
+    try:
+        detector = _get_mp_detector()
+        if detector is None:
+            return None
         
-        # Load and process image
-        image = Image.open(image_path)
-        image_rgb = image.convert('RGB')
-        image_np = np.array(image_rgb)
+        from mediapipe.tasks.python.vision.core import image as mp_image
+        
+        # Load and process image (unless already decoded by the caller)
+        image_np = image if image is not None else load_image_array(image_path)
         
         # Create MediaPipe Image
         mp_img = mp_image.Image(image_format=mp_image.ImageFormat.SRGB, data=image_np)
@@ -203,9 +245,9 @@ def _detect_faces_mediapipe(image_path: str) -> List[Dict[str, any]]:
                 area_score = min(1.0, face_area / (img_width * img_height))
                 center_x = x + width / 2
                 center_y = y + height / 2
-                distance_from_center = np.sqrt(
-                    ((center_x - img_width / 2) / img_width) ** 2 +
-                    ((center_y - img_height / 2) / img_height) ** 2
+                distance_from_center = hypot(
+                    (center_x - img_width / 2) / img_width,
+                    (center_y - img_height / 2) / img_height
                 )
                 centrality_score = 1.0 - min(1.0, distance_from_center)
                 quality_score = area_score * 0.7 + centrality_score * 0.3
@@ -224,17 +266,18 @@ def _detect_faces_mediapipe(image_path: str) -> List[Dict[str, any]]:
                     },
                     "confidence": float(confidence),
                     "quality_score": float(quality_score),
-                    "landmarks": {}
+                    "landmarks": {},
+                    "_face_location": (y, x + width, y + height, x)
                 })
         
         return faces
     except ImportError:
         # MediaPipe not installed
-        return []
+        return None
     except Exception as e:
         print(f"Error detecting faces with MediaPipe in {os.path.basename(image_path)}: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
-        return []
+        return None
 
 
@@ -3,46 +3,68 @@ Face embeddings for person identification.
 Uses face_recognition library to generate 128-dimensional face encodings.
 """
 
-from typing import List, Dict
+import base64
+from math import sqrt
+from typing import List, Dict, Optional
 import numpy as np
-from .face_detection import detect_faces, get_face_embeddings
+from .face_detection import FACE_RECOGNITION_AVAILABLE, _detect_faces, get_face_embeddings
+from .image_io import load_image_array
+from .result_cache import cached_by_file, decode_with_embeddings, encode_with_embeddings
 
 
-def get_face_encodings_for_photo(image_path: str) -> List[Dict[str, any]]:
+def get_face_encodings_for_photo(
+    image_path: str,
+    image: Optional[np.ndarray] = None
+) -> List[Dict[str, any]]:
     """
     Get face encodings (embeddings) for all faces in a photo.
     
     Args:
         image_path: Path to image file
+        image: Optional pre-decoded RGB array (skips loading image_path)
     
     Returns:
         List of face encodings, each with:
-        - embedding: 128-dimensional vector (as list)
+        - embedding: 128-dimensional vector (float32 ndarray)
         - box: Face bounding box
         - confidence: Detection confidence
         - quality_score: Face quality score
+        Empty if no faces were found or encoding failed.
     """
+    encodings = _get_face_encodings_for_photo(image_path, image=image)
+    return encodings if encodings is not None else []
+
+
+@cached_by_file(
+    "face_encodings_v2", encode_with_embeddings, decode_with_embeddings,
+    should_cache=lambda encodings: encodings is not None
+)
+def _get_face_encodings_for_photo(
+    image_path: str,
+    image: Optional[np.ndarray] = None
+) -> Optional[List[Dict[str, any]]]:
+    """Get face encodings (see get_face_encodings_for_photo), returning None on failure so it isn't cached."""
     try:
+        # Decode once and share with detection and encoding
+        if image is None:
+            image = load_image_array(image_path)
+        
         # Detect faces first
-        face_detections = detect_faces(image_path)
+        face_detections = _detect_faces(image_path, image=image)
         
+        if face_detections is None:
+            return None
         if not face_detections:
             return []
         
-        # Extract face locations for encoding
-        face_locations = []
-        for detection in face_detections:
-            box = detection["box"]
-            # face_recognition expects (top, right, bottom, left)
-            face_locations.append((
-                box["y"],
-                box["x"] + box["width"],
-                box["y"] + box["height"],
-                box["x"]
-            ))
+        # Face locations in face_recognition's (top, right, bottom, left) order
+        face_locations = [detection["_face_location"] for detection in face_detections]
         
         # Get face encodings
-        face_encodings = get_face_embeddings(image_path, face_locations)
+        face_encodings = get_face_embeddings(image_path, face_locations, image=image)
+        if not face_encodings and FACE_RECOGNITION_AVAILABLE:
+            # Faces were found, so no encodings means encoding failed
+            return None
         
         # Combine with detection info
         results = []
@@ -50,7 +72,7 @@ def get_face_encodings_for_photo(image_path: str) -> List[Dict[str, any]]:
             if i < len(face_detections):
                 detection = face_detections[i]
                 results.append({
-                    "embedding": encoding.tolist(),
+                    "embedding": encoding.astype(np.float32),
                     "box": detection["box"],
                     "confidence": detection["confidence"],
                     "quality_score": detection["quality_score"]
@@ -60,10 +82,53 @@ def get_face_encodings_for_photo(image_path: str) -> List[Dict[str, any]]:
     
     except Exception as e:
         print(f"Error getting face encodings from {image_path}: {e}")
-        return []
+        return None
+
+
+def encode_embedding(embedding: np.ndarray) -> str:
+    """
+    Encode a face embedding compactly for JSON output.
+    
+    Args:
+        embedding: 128-dimensional face encoding
+    
+    Returns:
+        Base64 of the little-endian float32 bytes (~6x smaller than a JSON list)
+    """
+    return base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_embedding(embedding_b64: str) -> np.ndarray:
+    """
+    Decode a face embedding produced by encode_embedding.
+    
+    Args:
+        embedding_b64: Base64-encoded float32 bytes
+    
+    Returns:
+        128-dimensional face encoding (float32)
+    """
+    return np.frombuffer(base64.b64decode(embedding_b64), dtype="<f4")
+
+
+def face_distance_sq(encoding1: np.ndarray, encoding2: np.ndarray) -> float:
+    """
+    Calculate squared Euclidean distance between two face encodings.
+    
+    Cheaper than face_distance when only comparing against a threshold.
+    
+    Args:
+        encoding1: First face encoding (128-dim vector)
+        encoding2: Second face encoding (128-dim vector)
+    
+    Returns:
+        Squared Euclidean distance (lower = more similar)
+    """
+    diff = np.asarray(encoding1, dtype=np.float32) - np.asarray(encoding2, dtype=np.float32)
+    return float(diff @ diff)
 
 
-def face_distance(encoding1: List[float], encoding2: List[float]) -> float:
+def face_distance(encoding1: np.ndarray, encoding2: np.ndarray) -> float:
     """
     Calculate Euclidean distance between two face encodings.
     
@@ -74,19 +139,48 @@ def face_distance(encoding1: List[float], encoding2: List[float]) -> float:
     Returns:
         Euclidean distance (lower = more similar)
     """
-    try:
-        vec1 = np.array(encoding1)
-        vec2 = np.array(encoding2)
-        return float(np.linalg.norm(vec1 - vec2))
+    return sqrt(face_distance_sq(encoding1, encoding2))
+
+
+def face_distance_sq_matrix(queries: np.ndarray, database: np.ndarray) -> np.ndarray:
+    """
+    Calculate squared Euclidean distances between every query and database encoding.
     
-    except Exception as e:
-        print(f"Error calculating face distance: {e}")
-        return 999.0  # Large distance for errors
+    Uses ||a - b||^2 = ||a||^2 + ||b||^2 - 2 a.b so the bulk of the work is
+    a single matrix multiply.
+    
+    Args:
+        queries: N x 128 face encodings
+        database: M x 128 face encodings
+    
+    Returns:
+        N x M matrix of squared Euclidean distances (lower = more similar)
+    """
+    q = np.asarray(queries, dtype=np.float32)
+    db = np.asarray(database, dtype=np.float32)
+    
+    sq_dist = (q * q).sum(axis=1)[:, None] + (db * db).sum(axis=1)[None, :] - 2.0 * (q @ db.T)
+    # Clamp rounding error so identical encodings don't go negative
+    return np.maximum(sq_dist, 0.0)
+
+
+def face_distance_matrix(queries: np.ndarray, database: np.ndarray) -> np.ndarray:
+    """
+    Calculate Euclidean distances between every query and database encoding.
+    
+    Args:
+        queries: N x 128 face encodings
+        database: M x 128 face encodings
+    
+    Returns:
+        N x M matrix of Euclidean distances (lower = more similar)
+    """
+    return np.sqrt(face_distance_sq_matrix(queries, database))
 
 
 def faces_match(
-    encoding1: List[float],
-    encoding2: List[float],
+    encoding1: np.ndarray,
+    encoding2: np.ndarray,
     tolerance: float = 0.6
 ) -> bool:
     """
@@ -100,9 +194,23 @@ def faces_match(
     Returns:
         True if faces match
     """
-    distance = face_distance(encoding1, encoding2)
-    return distance <= tolerance
-
-
+    return face_distance_sq(encoding1, encoding2) <= tolerance * tolerance
 
 
+def faces_match_matrix(
+    queries: np.ndarray,
+    database: np.ndarray,
+    tolerance: float = 0.6
+) -> np.ndarray:
+    """
+    Check which query/database face encoding pairs match (same person).
+    
+    Args:
+        queries: N x 128 face encodings
+        database: M x 128 face encodings
+        tolerance: Maximum distance for a match (default 0.6 works well)
+    
+    Returns:
+        N x M boolean matrix, True where faces match
+    """
+    return face_distance_sq_matrix(queries, database) <= tolerance * tolerance
@@ -0,0 +1,60 @@
+"""
+Image decoding shared by the ML services.
+"""
+
+import numpy as np
+from PIL import Image
+from typing import Optional, Tuple
+
+# libjpeg-turbo decodes JPEGs 2-4x faster than Pillow's bundled libjpeg
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+    TURBOJPEG_AVAILABLE = True
+except (ImportError, OSError, RuntimeError):
+    # Python package missing, or the libturbojpeg shared library isn't installed
+    TURBOJPEG_AVAILABLE = False
+
+# Extensions decoded with libjpeg-turbo when available
+JPEG_EXTENSIONS = (".jpg", ".jpeg")
+
+
+def _jpeg_scaling_factor(width: int, height: int, min_size: Tuple[int, int]) -> Optional[Tuple[int, int]]:
+    """Smallest libjpeg DCT scale (1/8, 1/4, 1/2) keeping both sides >= min_size, as Image.draft picks."""
+    for num, den in ((1, 8), (1, 4), (1, 2)):
+        if width >= den * min_size[0] and height >= den * min_size[1]:
+            return (num, den)
+    return None
+
+
+def load_image_array(image_path: str, min_size: Optional[Tuple[int, int]] = None) -> np.ndarray:
+    """
+    Decode an image to an RGB uint8 array (same as face_recognition.load_image_file).
+    
+    Decode once and pass the result to detect_faces / get_face_embeddings
+    to avoid re-reading the file in each. JPEGs go through libjpeg-turbo
+    when PyTurboJPEG is installed, everything else through Pillow.
+    
+    Args:
+        image_path: Path to image file
+        min_size: Let JPEGs decode at reduced (1/2 - 1/8) scale while staying
+            at least this (width, height), as Image.draft does. Other formats
+            are always decoded at full size
+    """
+    if TURBOJPEG_AVAILABLE and image_path.lower().endswith(JPEG_EXTENSIONS):
+        try:
+            with open(image_path, "rb") as f:
+                data = f.read()
+            scaling_factor = None
+            if min_size is not None:
+                width, height = _turbojpeg.decode_header(data)[:2]
+                scaling_factor = _jpeg_scaling_factor(width, height, min_size)
+            return _turbojpeg.decode(data, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+        except Exception:
+            # e.g. CMYK or truncated JPEGs - Pillow copes with more of these
+            pass
+    
+    with Image.open(image_path) as img:
+        if min_size is not None:
+            img.draft("RGB", min_size)
+        return np.array(img.convert("RGB"))
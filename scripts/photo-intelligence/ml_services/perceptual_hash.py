@@ -3,17 +3,69 @@ Perceptual hashing for near-duplicate detection.
 Uses pHash (perceptual hash) and dHash (difference hash).
 """
 
-import imagehash
+import numpy as np
 from PIL import Image
-from typing import Dict, Optional
+from scipy.fft import dct
+from typing import Dict, List, Optional
 
+from .image_io import load_image_array
+from .result_cache import cached_by_file, decode_json, encode_json
 
-def compute_hashes(image_path: str) -> Dict[str, str]:
+
+def _popcount_swar(x: int) -> int:
+    """Count set bits in a 64-bit integer (SWAR fallback for Python < 3.10)."""
+    x -= (x >> 1) & 0x5555555555555555
+    x = (x & 0x3333333333333333) + ((x >> 2) & 0x3333333333333333)
+    x = (x + (x >> 4)) & 0x0F0F0F0F0F0F0F0F
+    return ((x * 0x0101010101010101) & 0xFFFFFFFFFFFFFFFF) >> 56
+
+
+try:
+    (0).bit_count()
+    _popcount = int.bit_count
+except AttributeError:
+    _popcount = _popcount_swar
+
+
+# Images are box-downsampled toward this size before hashing
+HASH_DECODE_SIZE = (256, 256)
+
+
+def compute_popcount_table() -> np.ndarray:
+    """Build a lookup table of set-bit counts for every byte value."""
+    return np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+_POPCOUNT_TABLE = compute_popcount_table()
+
+
+def _phash_bits(gray: Image.Image) -> np.ndarray:
+    """pHash: 8x8 low-frequency DCT of a 32x32 thumbnail vs its median (as imagehash.phash)."""
+    pixels = np.asarray(gray.resize((32, 32), Image.Resampling.LANCZOS), dtype=np.float64)
+    low_freq = dct(dct(pixels, axis=0), axis=1)[:8, :8]
+    return low_freq > np.median(low_freq)
+
+
+def _dhash_bits(gray: Image.Image) -> np.ndarray:
+    """dHash: horizontal gradient signs of a 9x8 thumbnail (as imagehash.dhash)."""
+    pixels = np.asarray(gray.resize((9, 8), Image.Resampling.LANCZOS))
+    return pixels[:, 1:] > pixels[:, :-1]
+
+
+def _bits_to_hex(bits: np.ndarray) -> str:
+    """Pack a 64-bit boolean array (row-major, MSB first) into a 16-char hex string."""
+    return np.packbits(bits).tobytes().hex()
+
+
+@cached_by_file("hashes_v2", encode_json, decode_json, should_cache=lambda hashes: bool(hashes["phash"]))
+def compute_hashes(image_path: str, image: Optional[np.ndarray] = None) -> Dict[str, str]:
     """
     Compute perceptual hashes for an image.
     
     Args:
         image_path: Path to image file
+        image: Already-decoded RGB array of the file (skips the decode).
+            Hashes are the same either way
     
     Returns:
         Dictionary with:
@@ -21,19 +73,24 @@ def compute_hashes(image_path: str) -> Dict[str, str]:
         - dhash: Difference hash (64-bit hex string)
     """
     try:
-        with Image.open(image_path) as img:
-            # Convert to RGB if necessary
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-            
-            # Compute hashes
-            phash = imagehash.phash(img)
-            dhash = imagehash.dhash(img)
-            
-            return {
-                "phash": str(phash),
-                "dhash": str(dhash)
-            }
+        # Always start from the full-resolution pixels, so hashes (and the
+        # cache entries) don't depend on whether the caller decoded already
+        if image is None:
+            image = load_image_array(image_path)
+        
+        # Hashes work on <=32x32 thumbnails; box-downsample first
+        img = Image.fromarray(image)
+        factor = min(img.size) // min(HASH_DECODE_SIZE)
+        if factor > 1:
+            img = img.reduce(factor)
+        
+        # Convert to grayscale once and share it between both hashes
+        gray = img.convert("L")
+        
+        return {
+            "phash": _bits_to_hex(_phash_bits(gray)),
+            "dhash": _bits_to_hex(_dhash_bits(gray))
+        }
     
     except Exception as e:
         print(f"Error computing hashes for {image_path}: {e}")
@@ -50,19 +107,60 @@ def hamming_distance(hash1: str, hash2: str) -> int:
     
     Returns:
         Hamming distance (number of differing bits)
+    
+    Raises:
+        ValueError: If either hash is not a valid hex string
     """
-    try:
-        # Convert hex strings to integers
-        int1 = int(hash1, 16)
-        int2 = int(hash2, 16)
-        
-        # XOR and count set bits
-        xor_result = int1 ^ int2
-        return bin(xor_result).count("1")
+    # XOR and count set bits
+    return _popcount(int(hash1, 16) ^ int(hash2, 16))
+
+
+def hashes_to_uint64(hashes: List[str]) -> np.ndarray:
+    """
+    Parse 64-bit hex hash strings into a uint64 array.
     
-    except Exception as e:
-        print(f"Error calculating Hamming distance: {e}")
-        return 999  # Large distance for errors
+    Args:
+        hashes: List of hashes (hex strings)
+    
+    Returns:
+        Array of shape (N,) with dtype uint64
+    """
+    return np.fromiter((int(h, 16) for h in hashes), dtype=np.uint64, count=len(hashes))
+
+
+def hamming_matrix(hashes: List[str]) -> np.ndarray:
+    """
+    Calculate pairwise Hamming distances between all hashes at once.
+    
+    Parses each hash once and computes every distance with a single
+    vectorized XOR + byte-table popcount, instead of one Python-level
+    hamming_distance() call per pair.
+    
+    Args:
+        hashes: List of N hashes (64-bit hex strings)
+    
+    Returns:
+        N x N array of Hamming distances (uint8)
+    """
+    arr = hashes_to_uint64(hashes)
+    return hamming_block(arr, arr)
+
+
+def hamming_block(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Calculate Hamming distances between two blocks of parsed hashes.
+    
+    Use on tiles of a large corpus to bound memory to len(a) x len(b).
+    
+    Args:
+        a: Array of shape (N,) with dtype uint64 (see hashes_to_uint64)
+        b: Array of shape (M,) with dtype uint64
+    
+    Returns:
+        N x M array of Hamming distances (uint8)
+    """
+    xor = a[:, None] ^ b[None, :]
+    return _POPCOUNT_TABLE[xor.view(np.uint8)].reshape(len(a), len(b), 8).sum(axis=-1, dtype=np.uint8)
 
 
 def are_similar(
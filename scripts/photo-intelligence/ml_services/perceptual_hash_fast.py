@@ -0,0 +1,115 @@
+"""
+Numba-accelerated near-duplicate search over perceptual hashes.
+For hash corpora too large for an N x N hamming_matrix, emits only the
+similar pairs using a tiled, multi-core popcount kernel.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from .perceptual_hash import are_similar, hashes_to_uint64
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+
+# Hashes per tile side (512 x 512 uint64 pairs fit comfortably in L2)
+TILE_SIZE = 512
+
+
+if NUMBA_AVAILABLE:
+    @njit(cache=True, inline="always")
+    def _popcount64(x):
+        """SWAR popcount on a uint64 (LLVM lowers this to POPCNT where available)."""
+        x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+        x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+        x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+        return (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+
+    @njit(cache=True, parallel=True)
+    def _scan_pairs(hashes, threshold, offsets, out):
+        """
+        Scan all pairs (i, j) with i < j, tile by tile.
+
+        When out is empty, only counts matches per row into offsets.
+        Otherwise writes matches for row i starting at out[offsets[i]].
+        Each tile row is owned by one thread, so rows never race.
+        """
+        n = hashes.shape[0]
+        n_tiles = (n + TILE_SIZE - 1) // TILE_SIZE
+        counting = out.shape[0] == 0
+        for t in prange(n_tiles):
+            i0 = t * TILE_SIZE
+            i1 = min(i0 + TILE_SIZE, n)
+            for i in range(i0, i1):
+                a = hashes[i]
+                k = 0 if counting else offsets[i]
+                for j0 in range(i0, n, TILE_SIZE):
+                    j1 = min(j0 + TILE_SIZE, n)
+                    for j in range(max(j0, i + 1), j1):
+                        if _popcount64(a ^ hashes[j]) <= threshold:
+                            if not counting:
+                                out[k, 0] = i
+                                out[k, 1] = j
+                            k += 1
+                if counting:
+                    offsets[i] = k
+
+
+def hamming_pairs_below(hashes_u64: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Find all pairs of hashes within a Hamming distance threshold.
+
+    Args:
+        hashes_u64: Array of shape (N,) with dtype uint64
+        threshold: Maximum Hamming distance for similarity
+
+    Returns:
+        Array of shape (M, 2) with index pairs (i, j), i < j
+    """
+    if not NUMBA_AVAILABLE:
+        raise RuntimeError("numba is required for hamming_pairs_below")
+
+    hashes_u64 = np.ascontiguousarray(hashes_u64, dtype=np.uint64)
+    threshold = np.uint64(threshold)
+
+    # Pass 1: count matches per row, then turn counts into write offsets
+    counts = np.zeros(len(hashes_u64), dtype=np.int64)
+    _scan_pairs(hashes_u64, threshold, counts, np.empty((0, 2), dtype=np.int64))
+    offsets = np.zeros(len(hashes_u64), dtype=np.int64)
+    np.cumsum(counts[:-1], out=offsets[1:])
+
+    # Pass 2: write matches into a preallocated output
+    pairs = np.empty((int(counts.sum()), 2), dtype=np.int64)
+    _scan_pairs(hashes_u64, threshold, offsets, pairs)
+    return pairs
+
+
+def are_similar_batch(hashes: List[str], threshold: int = 10) -> List[Tuple[int, int]]:
+    """
+    Find all near-duplicate pairs in a list of hashes.
+
+    Uses the numba kernel when available, otherwise falls back to
+    pairwise are_similar() calls.
+
+    Args:
+        hashes: List of hashes (64-bit hex strings)
+        threshold: Maximum Hamming distance for similarity
+
+    Returns:
+        List of index pairs (i, j), i < j, whose hashes are similar
+    """
+    if NUMBA_AVAILABLE:
+        pairs = hamming_pairs_below(hashes_to_uint64(hashes), threshold)
+        return [(int(i), int(j)) for i, j in pairs]
+
+    return [
+        (i, j)
+        for i in range(len(hashes))
+        for j in range(i + 1, len(hashes))
+        if are_similar(hashes[i], hashes[j], threshold)
+    ]
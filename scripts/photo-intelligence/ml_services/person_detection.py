@@ -5,7 +5,8 @@ Detects full-body persons when face detection fails or for group shots.
 
 from ultralytics import YOLO
 import numpy as np
-from PIL import Image
+import torch
+from pathlib import Path
 from typing import List, Dict, Optional
 import os
 
@@ -13,21 +14,121 @@ import os
 # Global model instance (lazy loaded)
 _model: Optional[YOLO] = None
 
+# Inference backend: "auto" (TensorRT on CUDA, ONNX Runtime on CPU),
+# "engine", "onnx", or "pytorch" to opt out of exported models
+YOLO_BACKEND = os.environ.get("BOTTB_YOLO_BACKEND", "auto")
+
+# Images per YOLO forward pass (also the max batch of exported models)
+YOLO_BATCH_SIZE = 16
+
+
+def _load_exported_model(pt_model: YOLO, backend: str) -> YOLO:
+    """
+    Load an exported YOLO model, exporting it next to the .pt on first use.
+    
+    Args:
+        pt_model: Loaded PyTorch model
+        backend: "engine" (TensorRT FP16) or "onnx"
+    
+    Returns:
+        YOLO model backed by the exported file
+    """
+    exported_path = Path(pt_model.ckpt_path).with_suffix(f".{backend}")
+    if not exported_path.exists():
+        if backend == "engine":
+            exported_path = pt_model.export(
+                format="engine", half=True, imgsz=640, device=0,
+                dynamic=True, batch=YOLO_BATCH_SIZE
+            )
+        else:
+            exported_path = pt_model.export(format="onnx", half=False, imgsz=640, dynamic=True)
+    return YOLO(str(exported_path), task="detect")
+
 
 def _get_model() -> YOLO:
-    """Lazy load YOLO model."""
+    """Lazy load YOLO model, using an exported TensorRT/ONNX model when possible."""
     global _model
     if _model is None:
         # YOLOv8n (nano) is fastest, YOLOv8s (small) is more accurate
         # Auto-downloads on first use
         _model = YOLO("yolov8n.pt")
+        
+        backend = YOLO_BACKEND
+        if backend == "auto":
+            backend = "engine" if torch.cuda.is_available() else "onnx"
+        if backend != "pytorch":
+            try:
+                _model = _load_exported_model(_model, backend)
+            except Exception as e:
+                print(f"Could not load {backend} YOLO model, using PyTorch: {e}")
     return _model
 
 
+def _result_to_detections(result) -> List[Dict[str, any]]:
+    """Convert one YOLO result into person detections with quality scores."""
+    img_height, img_width = result.orig_shape
+    
+    # One device-to-host transfer per tensor rather than per box
+    boxes = result.boxes
+    xyxy = boxes.xyxy.cpu().numpy()
+    conf = boxes.conf.cpu().numpy()
+    cls = boxes.cls.cpu().numpy().astype(np.int32)
+    
+    # YOLO class 0 is "person"
+    person = cls == 0
+    xyxy = xyxy[person]
+    confidence = conf[person].astype(np.float64)
+    
+    # Convert to (x, y, width, height), truncating like int()
+    x = xyxy[:, 0].astype(np.int64)
+    y = xyxy[:, 1].astype(np.int64)
+    width = (xyxy[:, 2] - xyxy[:, 0]).astype(np.int64)
+    height = (xyxy[:, 3] - xyxy[:, 1]).astype(np.int64)
+    
+    # Calculate quality scores for all persons at once
+    area_score = np.minimum(1.0, (width * height) / (img_width * img_height))
+    
+    # Centrality score
+    center_x = x + width / 2
+    center_y = y + height / 2
+    distance_from_center = np.hypot(
+        (center_x - img_width / 2) / img_width,
+        (center_y - img_height / 2) / img_height
+    )
+    centrality_score = 1.0 - np.minimum(1.0, distance_from_center)
+    
+    # Quality: area (60%) + centrality (30%) + confidence (10%)
+    quality_score = (
+        area_score * 0.6 +
+        centrality_score * 0.3 +
+        confidence * 0.1
+    )
+    
+    detections = [
+        {
+            "box": {
+                "x": bx,
+                "y": by,
+                "width": bw,
+                "height": bh
+            },
+            "confidence": c,
+            "quality_score": q
+        }
+        for bx, by, bw, bh, c, q in zip(
+            x.tolist(), y.tolist(), width.tolist(), height.tolist(),
+            confidence.tolist(), quality_score.tolist()
+        )
+    ]
+    
+    return detections
+
+
 def detect_persons(
     image_path: str,
     conf_threshold: float = 0.25,
-    model_size: str = "nano"
+    model_size: str = "nano",
+    image: Optional[np.ndarray] = None
 ) -> List[Dict[str, any]]:
     """
     Detect persons (full-body) in an image using YOLOv8.
@@ -36,75 +137,84 @@ def detect_persons(
         image_path: Path to image file
         conf_threshold: Confidence threshold (0-1)
         model_size: "nano", "small", "medium", "large", "xlarge"
+        image: Already-decoded RGB array of the file (skips the decode)
     
     Returns:
         List of person detections, each with:
         - box: (x, y, width, height) in pixels
         - confidence: Detection confidence (0-1)
         - quality_score: Based on size and position
+        Empty if no persons were found or detection failed.
     """
+    persons = _detect_persons(image_path, conf_threshold, model_size, image=image)
+    return persons if persons is not None else []
+
+
+def _detect_persons(
+    image_path: str,
+    conf_threshold: float = 0.25,
+    model_size: str = "nano",
+    image: Optional[np.ndarray] = None
+) -> Optional[List[Dict[str, any]]]:
+    """Detect persons (see detect_persons), returning None if detection failed."""
     try:
         model = _get_model()
         
-        # Run inference
-        results = model(image_path, conf=conf_threshold, verbose=False)
+        # Run inference (ultralytics expects numpy input in BGR order)
+        source = image_path if image is None else np.ascontiguousarray(image[..., ::-1])
+        results = model(source, conf=conf_threshold, verbose=False)
         
         detections = []
-        img = Image.open(image_path)
-        img_width, img_height = img.size
-        
         for result in results:
-            boxes = result.boxes
-            for box in boxes:
-                # YOLO class 0 is "person"
-                if int(box.cls) == 0:
-                    # Get bounding box coordinates
-                    x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
-                    confidence = float(box.conf[0].cpu().numpy())
-                    
-                    # Convert to (x, y, width, height)
-                    x = int(x1)
-                    y = int(y1)
-                    width = int(x2 - x1)
-                    height = int(y2 - y1)
-                    
-                    # Calculate quality score
-                    person_area = width * height
-                    area_score = min(1.0, person_area / (img_width * img_height))
-                    
-                    # Centrality score
-                    center_x = x + width / 2
-                    center_y = y + height / 2
-                    distance_from_center = np.sqrt(
-                        ((center_x - img_width / 2) / img_width) ** 2 +
-                        ((center_y - img_height / 2) / img_height) ** 2
-                    )
-                    centrality_score = 1.0 - min(1.0, distance_from_center)
-                    
-                    # Quality: area (60%) + centrality (30%) + confidence (10%)
-                    quality_score = (
-                        area_score * 0.6 +
-                        centrality_score * 0.3 +
-                        confidence * 0.1
-                    )
-                    
-                    detections.append({
-                        "box": {
-                            "x": x,
-                            "y": y,
-                            "width": width,
-                            "height": height
-                        },
-                        "confidence": confidence,
-                        "quality_score": float(quality_score)
-                    })
+            detections.extend(_result_to_detections(result))
         
         return detections
     
     except Exception as e:
         print(f"Error detecting persons in {image_path}: {e}")
-        return []
+        return None
 
 
+def detect_persons_batch(
+    image_paths: List[str],
+    conf_threshold: float = 0.25,
+    batch_size: int = YOLO_BATCH_SIZE
+) -> List[List[Dict[str, any]]]:
+    """
+    Detect persons in many images, batch_size images per YOLO forward pass.
+    
+    Args:
+        image_paths: Paths to image files
+        conf_threshold: Confidence threshold (0-1)
+        batch_size: Number of images per forward pass (bounds decoded-image memory)
+    
+    Returns:
+        One list of person detections (see detect_persons) per path
+    """
+    return [
+        persons if persons is not None else []
+        for persons in _detect_persons_batch(image_paths, conf_threshold, batch_size)
+    ]
 
 
+def _detect_persons_batch(
+    image_paths: List[str],
+    conf_threshold: float = 0.25,
+    batch_size: int = YOLO_BATCH_SIZE
+) -> List[Optional[List[Dict[str, any]]]]:
+    """Detect persons in many images (see detect_persons_batch), with None for images that failed."""
+    detections: List[Optional[List[Dict[str, any]]]] = []
+    
+    for start in range(0, len(image_paths), batch_size):
+        chunk = image_paths[start:start + batch_size]
+        try:
+            model = _get_model()
+            results = model(chunk, conf=conf_threshold, verbose=False, stream=True)
+            detections.extend(_result_to_detections(result) for result in results)
+        except Exception as e:
+            # One bad image fails the whole forward pass - retry individually
+            print(f"Error detecting persons in batch starting at {chunk[0]}: {e}")
+            del detections[start:]
+            detections.extend(_detect_persons(path, conf_threshold) for path in chunk)
+    
+    return detections
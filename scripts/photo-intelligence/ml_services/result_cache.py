@@ -0,0 +1,206 @@
+"""
+On-disk cache for per-image ML results.
+Entries are keyed by (absolute path, mtime, size) so re-runs over an
+unchanged photo library skip recomputation entirely.
+"""
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+
+# Set BOTTB_PHOTO_CACHE=0 to disable, BOTTB_PHOTO_CACHE_DIR to relocate
+CACHE_ENABLED = os.environ.get("BOTTB_PHOTO_CACHE", "1") != "0"
+CACHE_DIR = Path(os.environ.get(
+    "BOTTB_PHOTO_CACHE_DIR",
+    Path(__file__).parent.parent / ".cache" / "photo-intel"
+))
+
+# Number of encoded results also kept in memory for this process
+MEMORY_CACHE_SIZE = 8192
+
+
+class ResultCache:
+    """SQLite-backed key/value store with a small in-memory LRU in front."""
+
+    def __init__(self, path: Path, memory_size: int = MEMORY_CACHE_SIZE):
+        self.path = path
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[bytes, bytes]" = OrderedDict()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections must not cross fork boundaries (worker pools)
+        if self._conn is None or self._pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(self.path), timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, value BLOB NOT NULL)")
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, key: bytes) -> Optional[bytes]:
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        row = self._connection().execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def set(self, key: bytes, value: bytes) -> None:
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO results (key, value) VALUES (?, ?)", (key, value))
+        self._remember(key, value)
+
+    def _remember(self, key: bytes, value: bytes) -> None:
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+
+# Global cache instance (lazy loaded)
+_cache: Optional[ResultCache] = None
+
+
+def get_cache() -> Optional[ResultCache]:
+    """Get the shared result cache, or None if caching is disabled."""
+    global _cache
+    if not CACHE_ENABLED:
+        return None
+    if _cache is None:
+        _cache = ResultCache(CACHE_DIR / "results.sqlite")
+    return _cache
+
+
+def cache_key(image_path: str, namespace: str) -> Optional[bytes]:
+    """
+    Build a cache key for an image file.
+
+    Args:
+        image_path: Path to image file
+        namespace: Result type and version, plus any arguments that affect it
+
+    Returns:
+        16-byte key, or None if the file can't be stat'ed
+    """
+    try:
+        stat = os.stat(image_path)
+    except OSError:
+        return None
+    path = os.path.abspath(image_path)
+    return hashlib.blake2b(
+        f"{path}|{stat.st_mtime_ns}|{stat.st_size}|{namespace}".encode(),
+        digest_size=16
+    ).digest()
+
+
+def cached_by_file(
+    namespace: str,
+    encode: Callable[[Any], bytes],
+    decode: Callable[[bytes], Any],
+    should_cache: Callable[[Any], bool] = lambda result: True
+) -> Callable:
+    """
+    Decorator caching a function whose first argument is an image path.
+
+    Other arguments (with defaults applied) become part of the key, except
+    `image`, which is only a pre-decoded copy of the file.
+
+    Args:
+        namespace: Result type and version (bump the version when the
+            computation changes to invalidate old entries)
+        encode: Serialize a result to bytes
+        decode: Deserialize bytes back to a result
+        should_cache: Return False for results that shouldn't be stored
+            (e.g. error sentinels)
+    """
+    def decorator(fn: Callable) -> Callable:
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(image_path: str, *args, **kwargs):
+            cache = get_cache()
+            if cache is None:
+                return fn(image_path, *args, **kwargs)
+
+            bound = signature.bind(image_path, *args, **kwargs)
+            bound.apply_defaults()
+            params = ",".join(
+                f"{name}={value!r}"
+                for name, value in bound.arguments.items()
+                if name not in ("image_path", "image")
+            )
+            key = cache_key(image_path, f"{namespace}({params})")
+
+            if key is not None:
+                value = cache.get(key)
+                if value is not None:
+                    return decode(value)
+
+            result = fn(image_path, *args, **kwargs)
+            if key is not None and should_cache(result):
+                cache.set(key, encode(result))
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def encode_json(result: Any) -> bytes:
+    """Serialize a JSON-compatible result."""
+    return json.dumps(result, separators=(",", ":")).encode()
+
+
+def decode_json(value: bytes) -> Any:
+    """Deserialize a JSON result."""
+    return json.loads(value)
+
+
+def encode_vector(vector: List[float]) -> bytes:
+    """Serialize an embedding as raw float32 bytes."""
+    return np.asarray(vector, dtype=np.float32).tobytes()
+
+
+def decode_vector(value: bytes) -> List[float]:
+    """Deserialize a float32 embedding back to a list."""
+    return np.frombuffer(value, dtype=np.float32).tolist()
+
+
+def encode_with_embeddings(results: List[Dict[str, Any]]) -> bytes:
+    """
+    Serialize dicts carrying an "embedding" array.
+
+    Layout: 4-byte header length, JSON header (all other fields), then the
+    stacked float32 embeddings as raw bytes.
+    """
+    header = json.dumps(
+        [{k: v for k, v in r.items() if k != "embedding"} for r in results],
+        separators=(",", ":")
+    ).encode()
+    embeddings = b"".join(np.asarray(r["embedding"], dtype=np.float32).tobytes() for r in results)
+    return len(header).to_bytes(4, "little") + header + embeddings
+
+
+def decode_with_embeddings(value: bytes) -> List[Dict[str, Any]]:
+    """Deserialize the output of encode_with_embeddings."""
+    header_len = int.from_bytes(value[:4], "little")
+    results = json.loads(value[4:4 + header_len])
+    if results:
+        embeddings = np.frombuffer(value[4 + header_len:], dtype=np.float32).reshape(len(results), -1)
+        for result, embedding in zip(results, embeddings):
+            result["embedding"] = embedding.copy()
+    return results
@@ -13,16 +13,95 @@ Processes photos in batches to generate:
 - Clustering results
 """
 
+import hashlib
 import json
+import multiprocessing
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
-import pandas as pd
+from itertools import islice
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
 from tqdm import tqdm
 from PIL import Image
 
+# xxhash digests file contents several times faster than hashlib
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# orjson serializes 5-10x faster than json, and numpy values natively
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+# Threads used to validate image files while scanning directories
+SCAN_WORKERS = 16
+
+# Leading bytes identifying the image formats we process
+IMAGE_MAGIC_NUMBERS = (
+    b'\xff\xd8\xff',        # JPEG
+    b'\x89PNG\r\n\x1a\n',  # PNG
+    b'II*\x00',            # TIFF (little-endian)
+    b'MM\x00*',            # TIFF (big-endian)
+)
+
+
+def _list_dir(path: str) -> List[os.DirEntry]:
+    """List a directory's entries, or nothing if it can't be read."""
+    try:
+        with os.scandir(path) as it:
+            return list(it)
+    except PermissionError:
+        return []
+
+
+def _is_valid_image(path: str) -> bool:
+    """
+    Check that a file is really an image, reading only its header.
+    
+    Known formats are recognized from their magic number; anything else
+    falls back to PIL, which parses the header without decoding pixels.
+    
+    Args:
+        path: File to check
+    
+    Returns:
+        True if the file is a readable image with valid dimensions
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(32)
+    except OSError:
+        return False
+    
+    if header.startswith(IMAGE_MAGIC_NUMBERS[1]):
+        # PNG IHDR holds big-endian width/height at bytes 16-24
+        width = int.from_bytes(header[16:20], 'big')
+        height = int.from_bytes(header[20:24], 'big')
+        return width > 0 and height > 0
+    if header.startswith(IMAGE_MAGIC_NUMBERS):
+        return True
+    
+    try:
+        with Image.open(path) as img:
+            # Verify it has valid dimensions
+            return img.width > 0 and img.height > 0
+    except Exception:
+        # Not a valid image file
+        return False
+
 
 def find_image_files(
     dir_path: Path,
@@ -42,52 +121,53 @@ def find_image_files(
     Returns:
         List of image file paths
     """
-    files: List[str] = []
-    
-    try:
-        entries = list(dir_path.iterdir())
-    except PermissionError:
-        return files
-    
-    for entry in entries:
+    # Walk the tree depth-first (same order as a recursive walk), only
+    # collecting candidate paths - this is cheap directory-entry work
+    candidates: List[str] = []
+    stack = [iter(_list_dir(str(dir_path)))]
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        
         # Skip macOS metadata files
         if entry.name.startswith('._') or entry.name == '.DS_Store':
             continue
         
         if entry.is_dir() and recursive:
-            # Recursively search subdirectories
-            sub_files = find_image_files(entry, recursive, skip_existing, existing_filenames)
-            files.extend(sub_files)
+            # Descend into subdirectory
+            stack.append(iter(_list_dir(entry.path)))
         elif entry.is_file():
             # Only process image files (not videos)
-            ext = entry.suffix.lower()
+            ext = os.path.splitext(entry.name)[1].lower()
             if ext in ['.jpg', '.jpeg', '.png', '.tiff', '.tif']:
-                # Validate it's actually an image (not a video with wrong extension)
-                try:
-                    with Image.open(entry) as img:
-                        # Verify it has valid dimensions
-                        if img.width > 0 and img.height > 0:
-                            # Check if we should skip existing files
-                            if skip_existing and existing_filenames:
-                                if entry.name in existing_filenames:
-                                    continue
-                            files.append(str(entry))
-                except Exception:
-                    # Not a valid image file, skip it
-                    continue
+                # Check if we should skip existing files
+                if skip_existing and existing_filenames:
+                    if entry.name in existing_filenames:
+                        continue
+                candidates.append(entry.path)
+    
+    # Validate it's actually an image (not a video with wrong extension).
+    # This is I/O-latency bound, so overlap the header reads across threads
+    with ThreadPoolExecutor(max_workers=SCAN_WORKERS) as executor:
+        valid = list(executor.map(_is_valid_image, candidates))
     
-    return files
+    return [path for path, is_valid in zip(candidates, valid) if is_valid]
 
 # Add ml_services to path
 ml_services_path = Path(__file__).parent / "ml_services"
 sys.path.insert(0, str(Path(__file__).parent))
 
-from ml_services.face_detection import detect_faces, get_face_embeddings
-from ml_services.person_detection import detect_persons
-from ml_services.perceptual_hash import compute_hashes
-from ml_services.image_embeddings import get_image_embedding
-from ml_services.face_embeddings import get_face_encodings_for_photo
+from ml_services.face_detection import _detect_faces, get_face_embeddings
+from ml_services.image_io import load_image_array
+from ml_services.person_detection import YOLO_BATCH_SIZE, _detect_persons, _detect_persons_batch
+from ml_services.perceptual_hash import compute_hashes, hamming_block, hashes_to_uint64
+from ml_services.image_embeddings import get_image_embedding, get_image_embeddings_batch
+from ml_services.face_embeddings import _get_face_encodings_for_photo, encode_embedding, decode_embedding, faces_match_matrix
 from ml_services.crop_calculator import calculate_smart_crop
+from ml_services.batch import warm_models
+from ml_services.result_cache import CACHE_ENABLED, ResultCache
 
 
 # Target aspect ratios for smart cropping
@@ -100,8 +180,44 @@ ASPECT_RATIOS = [
 # Saturation threshold below which an image is considered monochrome
 MONOCHROME_SATURATION_THRESHOLD = 0.1
 
+# Smallest size to decode images at for monochrome detection (JPEG draft mode)
+MONOCHROME_DECODE_SIZE = (256, 256)
+
+# Faces covering less than this fraction of the image (in total) still get
+# person detection, since the crops and person data may need full bodies
+PERSON_DETECTION_FACE_AREA = 0.05
+
+# Photos per tile side when comparing hashes (bounds memory to tile^2 distances)
+HASH_TILE_SIZE = 1024
+
+# Faces per tile side when comparing face encodings
+FACE_TILE_SIZE = 2048
+
+# Photos per tile side when comparing scene embeddings
+SCENE_TILE_SIZE = 1024
+
+# Version of process_photo's output - bump when any ml_service or the result
+# format changes, to invalidate the process cache
+PIPELINE_VERSION = 2
+
+# Columns of photos.parquet: a per-photo summary plus the embedding vectors,
+# which are kept out of the in-memory results
+PHOTOS_SCHEMA = pa.schema([
+    ("filename", pa.string()),
+    ("filepath", pa.string()),
+    ("width", pa.int64()),
+    ("height", pa.int64()),
+    ("phash", pa.string()),
+    ("dhash", pa.string()),
+    ("num_faces", pa.int64()),
+    ("num_persons", pa.int64()),
+    ("is_monochrome", pa.bool_()),
+    ("image_embedding", pa.list_(pa.float32())),
+    ("face_embeddings", pa.list_(pa.list_(pa.float32()))),
+])
+
 
-def detect_monochrome(image_path: str) -> bool:
+def detect_monochrome(image_path: str, image=None) -> bool:
     """
     Detect if an image is B&W or largely monochrome.
     
@@ -109,39 +225,96 @@ def detect_monochrome(image_path: str) -> bool:
     
     Args:
         image_path: Path to the image file
+        image: Already-decoded RGB array of the file (skips the decode)
         
     Returns:
         True if the image is monochrome/B&W, False if color
     """
     import numpy as np
     
-    with Image.open(image_path) as img:
-        # Convert to RGB if needed (handles grayscale, RGBA, etc.)
-        rgb_img = img.convert('RGB')
-        arr = np.array(rgb_img)
-    
-    # Extract R, G, B channels
-    r, g, b = arr[:, :, 0].astype(float), arr[:, :, 1].astype(float), arr[:, :, 2].astype(float)
+    if image is not None:
+        # Strided view at roughly the reduced decode size below (no copy)
+        step = max(1, min(image.shape[:2]) // min(MONOCHROME_DECODE_SIZE))
+        arr = image[::step, ::step]
+    else:
+        with Image.open(image_path) as img:
+            # Average saturation doesn't need full resolution - let libjpeg
+            # decode at reduced scale (no-op for non-JPEG formats)
+            img.draft('RGB', MONOCHROME_DECODE_SIZE)
+            # Convert to RGB if needed (handles grayscale, RGBA, etc.)
+            arr = np.asarray(img.convert('RGB'))
     
-    # Calculate saturation for each pixel
+    # Calculate saturation for each pixel, staying in uint8 until the divide
     # Saturation = (max(R,G,B) - min(R,G,B)) / max(R,G,B) for non-black pixels
-    max_rgb = np.maximum(np.maximum(r, g), b)
-    min_rgb = np.minimum(np.minimum(r, g), b)
+    max_rgb = arr.max(axis=2)
+    min_rgb = arr.min(axis=2)
     
-    # Avoid division by zero for black pixels
-    saturation = np.where(max_rgb > 0, (max_rgb - min_rgb) / max_rgb, 0)
+    # Black pixels have max == min == 0, so dividing by 1 gives saturation 0
+    saturation = (max_rgb - min_rgb).astype(np.float32) / np.maximum(max_rgb, 1)
     
     # Calculate average saturation
-    avg_saturation = np.mean(saturation)
+    avg_saturation = saturation.mean()
     
     return avg_saturation < MONOCHROME_SATURATION_THRESHOLD
 
 
+def _needs_person_detection(faces: List[Dict[str, Any]], img_w: int, img_h: int) -> bool:
+    """
+    Check whether a photo needs a YOLO person detection pass.
+    
+    Skipped when detected faces already cover enough of the image (e.g.
+    portraits and close group shots), where crops are driven by faces.
+    
+    Args:
+        faces: Face detections for the photo
+        img_w: Image width in pixels
+        img_h: Image height in pixels
+    
+    Returns:
+        True if persons should be detected
+    """
+    if not faces:
+        return True
+    total_face_area = sum(f["box"]["width"] * f["box"]["height"] for f in faces)
+    return total_face_area < PERSON_DETECTION_FACE_AREA * img_w * img_h
+
+
+def calculate_crops(
+    image_path: str,
+    faces: List[Dict[str, Any]],
+    persons: List[Dict[str, Any]],
+    width: int,
+    height: int
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Calculate smart crops for every target aspect ratio.
+    
+    Returns:
+        Dictionary mapping "w:h" aspect keys to crop results
+    """
+    crops = {}
+    for aspect_ratio in ASPECT_RATIOS:
+        crop_result = calculate_smart_crop(
+            image_path,
+            aspect_ratio,
+            faces,
+            persons,
+            width,
+            height
+        )
+        aspect_key = f"{aspect_ratio[0]}:{aspect_ratio[1]}"
+        crops[aspect_key] = crop_result
+    return crops
+
+
 def process_photo(
     image_path: str,
     output_dir: str,
     verbose: bool = False,
-    skip_faces: bool = False
+    skip_faces: bool = False,
+    image_embedding: Optional[List[float]] = None,
+    embedding_lists: bool = False,
+    persons: Optional[List[Dict[str, Any]]] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Process a single photo through the intelligence pipeline.
@@ -151,55 +324,66 @@ def process_photo(
         output_dir: Directory for temporary outputs
         verbose: Print progress
         skip_faces: Skip face detection and face embeddings
+        image_embedding: Precomputed image embedding (e.g. from a batched encode).
+            An empty list skips the embedding (for callers that attach it later)
+        embedding_lists: Also store face embeddings as plain float lists (legacy format)
+        persons: Precomputed person detections (e.g. from a batched YOLO pass).
+            By default persons are detected only if _needs_person_detection()
     
     Returns:
-        Dictionary with all processing results, or None if error
+        Dictionary with all processing results, or None if error. Its
+        "_complete" entry (internal) is False if a service failed and its
+        output was replaced by an empty default
     """
     try:
-        # Get image dimensions
-        with Image.open(image_path) as img:
-            width, height = img.size
-        
         filename = os.path.basename(image_path)
         
         if verbose:
             print(f"Processing {filename}...")
         
+        # Decode once and share the array across every service that needs
+        # full-resolution pixels (CLIP does its own reduced-scale decode)
+        image = load_image_array(image_path)
+        height, width = image.shape[:2]
+        
+        # Services return None on failure; record it and carry on without
+        complete = True
+        
         # 1. Face detection (skip if --skip-faces)
         faces = []
         if not skip_faces:
-            faces = detect_faces(image_path, model="hog")
+            faces = _detect_faces(image_path, model="hog", image=image)
+            complete &= faces is not None
+            faces = faces or []
         
-        # 2. Person detection (always run - useful for smart crops even without faces)
-        persons = detect_persons(image_path)
+        # 2. Person detection, unless faces already cover the image
+        if persons is None:
+            persons = []
+            if _needs_person_detection(faces, width, height):
+                persons = _detect_persons(image_path, image=image)
+                complete &= persons is not None
+                persons = persons or []
         
         # 3. Perceptual hashing
-        hashes = compute_hashes(image_path)
+        hashes = compute_hashes(image_path, image=image)
         
-        # 4. Image embedding (for scene clustering)
-        image_embedding = get_image_embedding(image_path)
+        # 4. Image embedding (for scene clustering), unless batch-encoded already
+        if image_embedding is None:
+            image_embedding = get_image_embedding(image_path)
+            complete &= len(image_embedding) > 0
         
         # 5. Face embeddings (skip if --skip-faces)
         face_encodings = []
         if not skip_faces:
-            face_encodings = get_face_encodings_for_photo(image_path)
+            face_encodings = _get_face_encodings_for_photo(image_path, image=image)
+            complete &= face_encodings is not None
+            face_encodings = face_encodings or []
         
         # 6. Smart crops for different aspect ratios
-        crops = {}
-        for aspect_ratio in ASPECT_RATIOS:
-            crop_result = calculate_smart_crop(
-                image_path,
-                aspect_ratio,
-                faces,
-                persons,
-                width,
-                height
-            )
-            aspect_key = f"{aspect_ratio[0]}:{aspect_ratio[1]}"
-            crops[aspect_key] = crop_result
+        crops = calculate_crops(image_path, faces, persons, width, height)
         
         # 7. Monochrome detection (B&W vs color)
-        is_monochrome = bool(detect_monochrome(image_path))
+        is_monochrome = bool(detect_monochrome(image_path, image=image))
         
         # Build result dictionary
         result = {
@@ -219,7 +403,7 @@ def process_photo(
             ],
             "face_encodings": [
                 {
-                    "embedding": fe["embedding"],
+                    "embedding_b64": encode_embedding(fe["embedding"]),
                     "box": fe["box"],
                     "confidence": fe["confidence"],
                     "quality_score": fe["quality_score"]
@@ -236,8 +420,13 @@ def process_photo(
             ],
             "crops": crops,
             "is_monochrome": is_monochrome,
+            "_complete": complete,
         }
         
+        if embedding_lists:
+            for record, fe in zip(result["face_encodings"], face_encodings):
+                record["embedding"] = fe["embedding"].tolist()
+        
         return result
     
     except Exception as e:
@@ -245,6 +434,24 @@ def process_photo(
         return None
 
 
+def _group_components(labels: np.ndarray) -> List[np.ndarray]:
+    """
+    Turn connected-component labels into index groups.
+    
+    Args:
+        labels: Component label per item
+    
+    Returns:
+        Indices of each component with more than one member, members in
+        index order and components ordered by their first member
+    """
+    order = np.argsort(labels, kind="stable")
+    bounds = np.flatnonzero(np.diff(labels[order])) + 1
+    groups = [group for group in np.split(order, bounds) if len(group) > 1]
+    groups.sort(key=lambda group: group[0])
+    return groups
+
+
 def cluster_near_duplicates(
     photo_results: List[Dict[str, Any]],
     hash_threshold: int = 10
@@ -252,6 +459,9 @@ def cluster_near_duplicates(
     """
     Cluster photos by perceptual hash (near-duplicates).
     
+    Photos are linked when either their phash or dhash is within the
+    threshold, and clusters are the connected components of those links.
+    
     Args:
         photo_results: List of photo processing results
         hash_threshold: Maximum Hamming distance for similarity
@@ -259,40 +469,68 @@ def cluster_near_duplicates(
     Returns:
         List of clusters, each containing filenames
     """
-    from ml_services.perceptual_hash import hamming_distance
-    
-    clusters = []
-    processed = set()
+    n = len(photo_results)
+    if n < 2:
+        return []
     
-    for i, photo1 in enumerate(photo_results):
-        if photo1["filename"] in processed:
-            continue
-        
-        cluster = [photo1["filename"]]
-        processed.add(photo1["filename"])
+    rows = []
+    cols = []
+    for hash_type in ("phash", "dhash"):
+        hashes = [photo["hashes"][hash_type] for photo in photo_results]
+        # Empty hashes mean hashing failed - never similar
+        valid = np.array([bool(h) for h in hashes])
+        parsed = hashes_to_uint64([h or "0" for h in hashes])
         
-        phash1 = photo1["hashes"]["phash"]
-        dhash1 = photo1["hashes"]["dhash"]
-        
-        for j, photo2 in enumerate(photo_results[i + 1:], start=i + 1):
-            if photo2["filename"] in processed:
-                continue
-            
-            phash2 = photo2["hashes"]["phash"]
-            dhash2 = photo2["hashes"]["dhash"]
-            
-            # Check both hashes
-            phash_dist = hamming_distance(phash1, phash2)
-            dhash_dist = hamming_distance(dhash1, dhash2)
-            
-            if phash_dist <= hash_threshold or dhash_dist <= hash_threshold:
-                cluster.append(photo2["filename"])
-                processed.add(photo2["filename"])
-        
-        if len(cluster) > 1:
-            clusters.append(cluster)
+        # Upper-triangle tiles only; distances are symmetric
+        for i0 in range(0, n, HASH_TILE_SIZE):
+            i1 = min(i0 + HASH_TILE_SIZE, n)
+            for j0 in range(i0, n, HASH_TILE_SIZE):
+                j1 = min(j0 + HASH_TILE_SIZE, n)
+                similar = hamming_block(parsed[i0:i1], parsed[j0:j1]) <= hash_threshold
+                similar &= valid[i0:i1, None] & valid[None, j0:j1]
+                i, j = np.nonzero(similar)
+                rows.append(i + i0)
+                cols.append(j + j0)
     
-    return clusters
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    adjacency = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(adjacency, directed=False)
+    
+    return [
+        [photo_results[i]["filename"] for i in group]
+        for group in _group_components(labels)
+    ]
+
+
+def _scene_components(embeddings: np.ndarray, similarity_threshold: float) -> List[np.ndarray]:
+    """
+    Group unit-normalized embeddings into components of the cos >= threshold graph.
+    
+    Args:
+        embeddings: N x D float32 matrix with L2-normalized rows
+        similarity_threshold: Minimum cosine similarity for an edge
+    
+    Returns:
+        Index groups with more than one member (see _group_components)
+    """
+    n = len(embeddings)
+    rows = []
+    cols = []
+    # Upper-triangle tiles only; similarity (a dot product of unit vectors) is symmetric
+    for i0 in range(0, n, SCENE_TILE_SIZE):
+        i1 = min(i0 + SCENE_TILE_SIZE, n)
+        for j0 in range(i0, n, SCENE_TILE_SIZE):
+            j1 = min(j0 + SCENE_TILE_SIZE, n)
+            i, j = np.nonzero(embeddings[i0:i1] @ embeddings[j0:j1].T >= similarity_threshold)
+            rows.append(i + i0)
+            cols.append(j + j0)
+    
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    adjacency = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(adjacency, directed=False)
+    return _group_components(labels)
 
 
 def cluster_scenes(
@@ -302,6 +540,11 @@ def cluster_scenes(
     """
     Cluster photos by scene similarity using image embeddings.
     
+    Photos are linked when their embeddings' cosine similarity reaches the
+    threshold, and clusters are the connected components of those links.
+    This is exactly what DBSCAN with min_samples=2 produces, without
+    materializing dense distance blocks for the whole neighbourhood search.
+    
     Args:
         photo_results: List of photo processing results
         similarity_threshold: Minimum cosine similarity for same scene
@@ -309,35 +552,23 @@ def cluster_scenes(
     Returns:
         List of clusters, each containing filenames
     """
-    from sklearn.cluster import DBSCAN
-    from ml_services.image_embeddings import cosine_similarity
-    import numpy as np
-    
     # Filter photos with valid embeddings
-    valid_photos = [p for p in photo_results if p.get("image_embedding")]
+    valid_photos = [p for p in photo_results if p.get("image_embedding") is not None and len(p["image_embedding"]) > 0]
     
     if len(valid_photos) < 2:
         return []
     
-    # Build similarity matrix
-    embeddings = np.array([p["image_embedding"] for p in valid_photos])
-    
-    # Use DBSCAN for clustering
-    # Convert similarity threshold to distance (1 - similarity)
-    eps = 1.0 - similarity_threshold
-    
-    clustering = DBSCAN(eps=eps, min_samples=2, metric="cosine")
-    labels = clustering.fit_predict(embeddings)
-    
-    # Group by cluster
-    clusters = {}
-    for idx, label in enumerate(labels):
-        if label != -1:  # -1 is noise in DBSCAN
-            if label not in clusters:
-                clusters[label] = []
-            clusters[label].append(valid_photos[idx]["filename"])
+    # L2-normalize so a dot product is the cosine similarity
+    embeddings = np.empty((len(valid_photos), len(valid_photos[0]["image_embedding"])), dtype=np.float32)
+    for i, photo in enumerate(valid_photos):
+        embeddings[i] = photo["image_embedding"]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    embeddings /= np.where(norms == 0, 1, norms)
     
-    return list(clusters.values())
+    return [
+        [valid_photos[i]["filename"] for i in group]
+        for group in _scene_components(embeddings, similarity_threshold)
+    ]
 
 
 def cluster_people(
@@ -347,6 +578,9 @@ def cluster_people(
     """
     Cluster faces to identify the same people across photos.
     
+    Faces are linked when their encodings are within the distance
+    threshold, and each connected component of links is one person.
+    
     Args:
         photo_results: List of photo processing results
         face_distance_threshold: Maximum face distance for same person
@@ -357,15 +591,14 @@ def cluster_people(
         - photo_filenames: List of photos containing this person
         - representative_face: Best quality face from cluster
     """
-    from ml_services.face_embeddings import face_distance
-    
     # Collect all faces with their photo filenames
     all_faces = []
     for photo in photo_results:
         for face_encoding in photo.get("face_encodings", []):
             all_faces.append({
                 "filename": photo["filename"],
-                "embedding": face_encoding["embedding"],
+                # Checkpoints from older runs only have the list form
+                "embedding": _face_embedding(face_encoding),
                 "box": face_encoding["box"],
                 "quality_score": face_encoding["quality_score"],
                 "confidence": face_encoding["confidence"]
@@ -374,42 +607,241 @@ def cluster_people(
     if len(all_faces) < 2:
         return []
     
-    # Simple clustering: group faces by distance
-    clusters = []
-    processed = set()
+    # Link every pair of matching faces, one GEMM per tile
+    encodings = np.stack([face["embedding"] for face in all_faces]).astype(np.float32)
+    n = len(encodings)
+    rows = []
+    cols = []
+    for i0 in range(0, n, FACE_TILE_SIZE):
+        i1 = min(i0 + FACE_TILE_SIZE, n)
+        for j0 in range(i0, n, FACE_TILE_SIZE):
+            j1 = min(j0 + FACE_TILE_SIZE, n)
+            matches = faces_match_matrix(encodings[i0:i1], encodings[j0:j1], face_distance_threshold)
+            i, j = np.nonzero(matches)
+            rows.append(i + i0)
+            cols.append(j + j0)
     
-    for i, face1 in enumerate(all_faces):
-        if i in processed:
-            continue
-        
-        cluster = {
+    rows = np.concatenate(rows)
+    cols = np.concatenate(cols)
+    adjacency = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(n, n))
+    _, labels = connected_components(adjacency, directed=False)
+    
+    quality_scores = np.array([face["quality_score"] for face in all_faces])
+    clusters = []
+    for group in _group_components(labels):
+        faces = [all_faces[i] for i in group]
+        clusters.append({
             "person_id": len(clusters),
-            "photo_filenames": [face1["filename"]],
-            "faces": [face1],
-            "representative_face": face1
-        }
-        processed.add(i)
-        
-        for j, face2 in enumerate(all_faces[i + 1:], start=i + 1):
-            if j in processed:
-                continue
-            
-            distance = face_distance(face1["embedding"], face2["embedding"])
-            if distance <= face_distance_threshold:
-                cluster["photo_filenames"].append(face2["filename"])
-                cluster["faces"].append(face2)
-                processed.add(j)
-                
-                # Update representative face if this one is better
-                if face2["quality_score"] > cluster["representative_face"]["quality_score"]:
-                    cluster["representative_face"] = face2
-        
-        if len(cluster["faces"]) > 1:
-            clusters.append(cluster)
+            "photo_filenames": [face["filename"] for face in faces],
+            "faces": faces,
+            # Best quality face (first one on ties)
+            "representative_face": all_faces[group[np.argmax(quality_scores[group])]]
+        })
     
     return clusters
 
 
+def file_digest(image_path: str) -> str:
+    """
+    Hash a file's contents (xxh3 when available, otherwise BLAKE2b).
+    
+    Args:
+        image_path: Path to the file
+    
+    Returns:
+        Hex digest prefixed with the algorithm name
+    """
+    if XXHASH_AVAILABLE:
+        name, hasher = "xxh3", xxhash.xxh3_64()
+    else:
+        name, hasher = "blake2b", hashlib.blake2b(digest_size=16)
+    with open(image_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return f"{name}:{hasher.hexdigest()}"
+
+
+def process_cache_key(image_path: str, skip_faces: bool, embedding_lists: bool) -> Optional[bytes]:
+    """
+    Build a content-addressed process cache key for a photo.
+    
+    Unlike the per-service result cache (keyed by path and mtime), this
+    survives renames, copies and touched files.
+    
+    Args:
+        image_path: Path to image file
+        skip_faces: process_photo's skip_faces setting
+        embedding_lists: process_photo's embedding_lists setting
+    
+    Returns:
+        16-byte key, or None if the file can't be read
+    """
+    try:
+        digest = file_digest(image_path)
+    except OSError:
+        return None
+    return hashlib.blake2b(
+        f"{digest}|v{PIPELINE_VERSION}|skip_faces={skip_faces}|embedding_lists={embedding_lists}".encode(),
+        digest_size=16
+    ).digest()
+
+
+def process_photo_worker(task: Tuple) -> Optional[Dict[str, Any]]:
+    """Picklable single-argument wrapper around process_photo for executor.map."""
+    return process_photo(*task)
+
+
+def _attach_persons(results: Dict[str, Dict[str, Any]], image_paths: List[str]) -> None:
+    """
+    Run batched person detection on some photos and redo their crops, in place.
+    
+    Photos whose detection failed get empty persons and "_complete" cleared.
+    
+    Args:
+        results: process_photo results by path
+        image_paths: Paths (keys of results) to detect persons in
+    """
+    if not image_paths:
+        return
+    for image_path, persons in zip(image_paths, _detect_persons_batch(image_paths)):
+        result = results[image_path]
+        if persons is None:
+            result["_complete"] = False
+            persons = []
+        result["persons"] = [
+            {
+                "box": p["box"],
+                "confidence": p["confidence"],
+                "quality_score": p["quality_score"]
+            }
+            for p in persons
+        ]
+        result["crops"] = calculate_crops(image_path, result["faces"], persons, result["width"], result["height"])
+
+
+def _face_embedding(face_encoding: Dict[str, Any]) -> Any:
+    """A face encoding's embedding, from either the base64 or the list form."""
+    if "embedding_b64" in face_encoding:
+        return decode_embedding(face_encoding["embedding_b64"])
+    return face_encoding["embedding"]
+
+
+def photos_table(results: List[Dict[str, Any]]) -> pa.Table:
+    """
+    Build photos.parquet rows for a list of photo processing results.
+    
+    Args:
+        results: List of photo processing results
+    
+    Returns:
+        Arrow table with PHOTOS_SCHEMA columns
+    """
+    return pa.Table.from_pylist([
+        {
+            "filename": r["filename"],
+            "filepath": r["filepath"],
+            "width": r["width"],
+            "height": r["height"],
+            "phash": r["hashes"]["phash"],
+            "dhash": r["hashes"]["dhash"],
+            "num_faces": len(r["faces"]),
+            "num_persons": len(r["persons"]),
+            "is_monochrome": r.get("is_monochrome", None),
+            "image_embedding": r.get("image_embedding") or [],
+            "face_embeddings": [_face_embedding(fe) for fe in r.get("face_encodings", [])],
+        }
+        for r in results
+    ], schema=PHOTOS_SCHEMA)
+
+
+def strip_embeddings(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Copy a result without its embedding vectors, to keep in memory.
+    
+    The vectors are written to photos.parquet and reattached for
+    clustering with attach_embeddings().
+    """
+    light = {k: v for k, v in result.items() if k != "image_embedding"}
+    light["face_encodings"] = [
+        {k: v for k, v in fe.items() if k not in ("embedding_b64", "embedding")}
+        for fe in result.get("face_encodings", [])
+    ]
+    return light
+
+
+def attach_embeddings(results: List[Dict[str, Any]], photos_parquet_path: Path) -> None:
+    """
+    Reattach embedding vectors from photos.parquet to stripped results, in place.
+    
+    Vectors become float32 views into two contiguous arrays (one for image
+    embeddings, one for face embeddings) rather than lists of Python floats.
+    
+    Args:
+        results: Stripped results, in photos.parquet row order
+        photos_parquet_path: Path to photos.parquet
+    """
+    table = pq.read_table(photos_parquet_path, columns=["image_embedding", "face_embeddings"])
+    
+    images = table.column("image_embedding").combine_chunks()
+    image_offsets = np.asarray(images.offsets)
+    image_values = images.flatten().to_numpy()
+    image_offsets = image_offsets - image_offsets[0]
+    
+    photo_faces = table.column("face_embeddings").combine_chunks()
+    photo_face_offsets = np.asarray(photo_faces.offsets)
+    photo_face_offsets = photo_face_offsets - photo_face_offsets[0]
+    faces = photo_faces.flatten()
+    face_offsets = np.asarray(faces.offsets)
+    face_offsets = face_offsets - face_offsets[0]
+    face_values = faces.flatten().to_numpy()
+    
+    for i, result in enumerate(results):
+        result["image_embedding"] = image_values[image_offsets[i]:image_offsets[i + 1]]
+        for k, face_encoding in enumerate(result["face_encodings"]):
+            j = photo_face_offsets[i] + k
+            face_encoding["embedding"] = face_values[face_offsets[j]:face_offsets[j + 1]]
+
+
+def dump_json_bytes(data: Any) -> bytes:
+    """Serialize data to compact JSON (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(data, separators=(",", ":")).encode()
+
+
+def load_json_bytes(data: bytes) -> Any:
+    """Deserialize JSON (orjson when available)."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def iter_results_log(results_path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Read photo processing results from an append-only JSONL log.
+    
+    Args:
+        results_path: Path to photos.jsonl
+    
+    Yields:
+        Results in log order, skipping a partially written last line (e.g.
+        after a crash mid-batch)
+    """
+    with open(results_path, "rb") as f:
+        for line in f:
+            try:
+                yield load_json_bytes(line)
+            except json.JSONDecodeError:
+                pass
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Split an iterable into lists of up to size items."""
+    it = iter(items)
+    while chunk := list(islice(it, size)):
+        yield chunk
+
+
 def main():
     """Main pipeline entry point."""
     import argparse
@@ -426,6 +858,8 @@ def main():
     parser.add_argument("--existing-filenames", type=str, help="Path to JSON file with existing filenames (for --skip-existing)")
     parser.add_argument("--resume", action="store_true", help="Resume from checkpoint if available (default: auto-resume)")
     parser.add_argument("--fresh", action="store_true", help="Start fresh, ignoring any existing checkpoint")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for per-photo processing (default: CPU count)")
+    parser.add_argument("--embedding-lists", action="store_true", help="Also write face embeddings as JSON float lists (legacy format, ~6x larger)")
     
     args = parser.parse_args()
     
@@ -456,115 +890,186 @@ def main():
     
     print(f"Found {len(image_files)} image files")
     
-    # Checkpoint file to track progress
+    # Checkpoint file to track progress; results themselves go to an
+    # append-only log so each batch writes only its own results. Only
+    # stripped results (no embedding vectors) are kept in memory.
     checkpoint_path = output_dir / "checkpoint.json"
+    results_path = output_dir / "photos.jsonl"
     processed_files = set()
     all_results = []
+    resumed_results: Iterable[Dict[str, Any]] = []
     
     # Load checkpoint if it exists (auto-resume by default, unless --fresh is specified)
     if not args.fresh and checkpoint_path.exists():
         try:
-            with open(checkpoint_path, "r") as f:
-                checkpoint_data = json.load(f)
-                processed_files = set(checkpoint_data.get("processed_files", []))
-                if "results" in checkpoint_data:
-                    all_results = checkpoint_data["results"]
-                last_updated = checkpoint_data.get("last_updated", "unknown")
-                print(f"Resuming from checkpoint: {len(processed_files)} files already processed, {len(all_results)} results loaded")
-                print(f"  Last updated: {last_updated}")
+            checkpoint_data = load_json_bytes(checkpoint_path.read_bytes())
+            processed_files = set(checkpoint_data.get("processed_files", []))
+            if not results_path.exists() and "results" in checkpoint_data:
+                # Checkpoints from older runs carry the results inline
+                resumed_results = checkpoint_data["results"]
+            last_updated = checkpoint_data.get("last_updated", "unknown")
+            print(f"Resuming from checkpoint (last updated: {last_updated})")
         except Exception as e:
             print(f"Warning: Could not load checkpoint: {e}")
             processed_files = set()
-            all_results = []
     elif args.fresh and checkpoint_path.exists():
         checkpoint_path.unlink()
         print("Starting fresh (checkpoint file removed)")
     
-    # Process photos in batches
-    total_batches = (len(image_files) + args.batch_size - 1) // args.batch_size
-    for batch_idx, i in enumerate(tqdm(range(0, len(image_files), args.batch_size), desc="Processing batches", total=total_batches)):
-        batch = image_files[i:i + args.batch_size]
-        batch_results = []
-        
-        # Skip already processed files
-        batch = [f for f in batch if f not in processed_files]
-        if not batch:
-            continue
-        
-        for image_path in tqdm(batch, desc=f"Batch {batch_idx + 1}/{total_batches}", leave=False):
-            result = process_photo(image_path, str(output_dir), args.verbose, args.skip_faces)
-            if result:
-                batch_results.append(result)
-                processed_files.add(image_path)
-        
-        all_results.extend(batch_results)
-        
-        # Save checkpoint after each batch
-        checkpoint_data = {
-            "processed_files": list(processed_files),
-            "results": all_results,
-            "last_updated": datetime.now().isoformat(),
-            "total_processed": len(all_results)
-        }
-        with open(checkpoint_path, "w") as f:
-            json.dump(checkpoint_data, f, indent=2)
+    # The log is authoritative: resume from it even without a checkpoint
+    # (e.g. after a crash before the first checkpoint was written)
+    if not args.fresh and results_path.exists():
+        resumed_results = iter_results_log(results_path)
+    
+    # photos.parquet is written a row group per batch. Start it and the log
+    # from what was resumed, a chunk at a time (drops stale or partial entries)
+    photos_parquet_path = output_dir / "photos.parquet"
+    new_results_path = results_path.with_suffix(".jsonl.tmp")
+    parquet_writer = None
+    try:
+        parquet_writer = pq.ParquetWriter(photos_parquet_path, PHOTOS_SCHEMA)
+        with open(new_results_path, "wb") as f:
+            for chunk in _chunks(resumed_results, args.batch_size):
+                for r in chunk:
+                    f.write(dump_json_bytes(r) + b"\n")
+                parquet_writer.write_table(photos_table(chunk))
+                all_results.extend(strip_embeddings(r) for r in chunk)
+        new_results_path.replace(results_path)
         
-        # Save incremental Parquet file
         if all_results:
-            photos_df = pd.DataFrame([
-                {
-                    "filename": r["filename"],
-                    "filepath": r["filepath"],
-                    "width": r["width"],
-                    "height": r["height"],
-                    "phash": r["hashes"]["phash"],
-                    "dhash": r["hashes"]["dhash"],
-                    "num_faces": len(r["faces"]),
-                    "num_persons": len(r["persons"]),
-                    "is_monochrome": r.get("is_monochrome", None),
-                }
-                for r in all_results
-            ])
-            photos_parquet_path = output_dir / "photos.parquet"
-            photos_df.to_parquet(photos_parquet_path, index=False)
+            # Results logged after the last checkpoint write are done too
+            processed_files.update(r["filepath"] for r in all_results)
+            print(f"  {len(processed_files)} files already processed, {len(all_results)} results loaded")
         
-        # Save incremental JSON file
-        photos_json_path = output_dir / "photos.json"
-        with open(photos_json_path, "w") as f:
-            json.dump(all_results, f, indent=2)
+        # Content-addressed cache of whole process_photo results (shares the
+        # BOTTB_PHOTO_CACHE switch with the per-service cache). --fresh skips
+        # reading it, so every photo is recomputed and its entry replaced
+        process_cache = ResultCache(output_dir / "process_cache" / "results.sqlite") if CACHE_ENABLED else None
         
-        if args.verbose:
-            print(f"Checkpoint saved: {len(all_results)} photos processed")
+        # Process photos in batches. CLIP and YOLO run batched in this process
+        # while the CPU-bound rest of process_photo (faces, hashes, monochrome,
+        # crops) runs in worker processes that load their face models once.
+        # Workers are spawned rather than forked from a process using torch/CUDA.
+        total_batches = (len(image_files) + args.batch_size - 1) // args.batch_size
+        n_workers = args.workers or os.cpu_count() or 1
+        with open(results_path, "ab") as results_file, ProcessPoolExecutor(
+            max_workers=n_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=warm_models,
+            initargs=(args.skip_faces, False)
+        ) as executor:
+            for batch_idx, i in enumerate(tqdm(range(0, len(image_files), args.batch_size), desc="Processing batches", total=total_batches)):
+                batch = image_files[i:i + args.batch_size]
+                batch_results = []
+                
+                # Skip already processed files
+                batch = [f for f in batch if f not in processed_files]
+                if not batch:
+                    continue
+                
+                # Serve photos whose contents were processed before from the cache
+                batch_done = {}
+                cache_keys = {}
+                if process_cache is not None:
+                    for image_path in batch:
+                        key = process_cache_key(image_path, args.skip_faces, args.embedding_lists)
+                        value = process_cache.get(key) if key is not None and not args.fresh else None
+                        if value is not None:
+                            result = load_json_bytes(value)
+                            # Same contents may have been processed under another name
+                            result["filename"] = os.path.basename(image_path)
+                            result["filepath"] = image_path
+                            batch_done[image_path] = result
+                        else:
+                            cache_keys[image_path] = key
+                misses = [f for f in batch if f not in batch_done]
+                
+                if misses:
+                    # Start the workers first. They run without the embedding or
+                    # persons (empty lists keep CLIP and YOLO out of them); both
+                    # are filled in here while the workers are busy
+                    tasks = [
+                        (image_path, str(output_dir), args.verbose, args.skip_faces, [], args.embedding_lists, [])
+                        for image_path in misses
+                    ]
+                    results = executor.map(process_photo_worker, tasks, chunksize=4)
+                    
+                    # Run the misses through CLIP in batched forward passes
+                    batch_embeddings = get_image_embeddings_batch(misses)
+                    
+                    # Batched YOLO over just the photos whose faces don't cover the
+                    # image, a full YOLO batch at a time as worker results arrive
+                    computed = {}
+                    need_persons = []
+                    for image_path, result, image_embedding in tqdm(zip(misses, results, batch_embeddings), desc=f"Batch {batch_idx + 1}/{total_batches}", total=len(misses), leave=False):
+                        if not result:
+                            continue
+                        result["image_embedding"] = image_embedding
+                        computed[image_path] = result
+                        if _needs_person_detection(result["faces"], result["width"], result["height"]):
+                            need_persons.append(image_path)
+                            if len(need_persons) == YOLO_BATCH_SIZE:
+                                _attach_persons(computed, need_persons)
+                                need_persons = []
+                    _attach_persons(computed, need_persons)
+                    
+                    # Cache only results where every service succeeded, so a
+                    # failed model load or inference is retried on the next run
+                    for image_path, result in computed.items():
+                        complete = result.pop("_complete") and len(result["image_embedding"]) > 0
+                        batch_done[image_path] = result
+                        if complete and cache_keys.get(image_path) is not None:
+                            process_cache.set(cache_keys[image_path], dump_json_bytes(result))
+                
+                for image_path in batch:
+                    if image_path in batch_done:
+                        batch_results.append(batch_done[image_path])
+                        processed_files.add(image_path)
+                
+                all_results.extend(strip_embeddings(r) for r in batch_results)
+                
+                # Append this batch's results before recording it in the checkpoint
+                for r in batch_results:
+                    results_file.write(dump_json_bytes(r) + b"\n")
+                results_file.flush()
+                if batch_results:
+                    parquet_writer.write_table(photos_table(batch_results))
+                
+                # Save checkpoint after each batch
+                checkpoint_data = {
+                    "processed_files": list(processed_files),
+                    "last_updated": datetime.now().isoformat(),
+                    "total_processed": len(all_results)
+                }
+                checkpoint_path.write_bytes(dump_json_bytes(checkpoint_data))
+                
+                if args.verbose:
+                    print(f"Checkpoint saved: {len(all_results)} photos processed")
+    finally:
+        if parquet_writer is not None:
+            parquet_writer.close()
     
     print(f"Processed {len(all_results)} photos successfully")
     
-    # Final save (redundant but ensures consistency)
+    # Consolidated results for upload-intelligence, written once by
+    # splicing the log's lines into a JSON array
     if all_results:
-        photos_df = pd.DataFrame([
-            {
-                "filename": r["filename"],
-                "filepath": r["filepath"],
-                "width": r["width"],
-                "height": r["height"],
-                "phash": r["hashes"]["phash"],
-                "dhash": r["hashes"]["dhash"],
-                "num_faces": len(r["faces"]),
-                "num_persons": len(r["persons"]),
-                "is_monochrome": r.get("is_monochrome", None),
-            }
-            for r in all_results
-        ])
-        photos_parquet_path = output_dir / "photos.parquet"
-        photos_df.to_parquet(photos_parquet_path, index=False)
         print(f"Saved photo data to {photos_parquet_path}")
         
         photos_json_path = output_dir / "photos.json"
-        with open(photos_json_path, "w") as f:
-            json.dump(all_results, f, indent=2)
+        with open(results_path, "rb") as src, open(photos_json_path, "wb") as dst:
+            dst.write(b"[")
+            for n, line in enumerate(src):
+                if n:
+                    dst.write(b",")
+                dst.write(line.rstrip(b"\n"))
+            dst.write(b"]")
         print(f"Saved full results to {photos_json_path}")
     
     # Clustering
     if not args.skip_clustering:
+        attach_embeddings(all_results, photos_parquet_path)
+        
         print("Clustering near-duplicates...")
         near_duplicate_clusters = cluster_near_duplicates(all_results)
         
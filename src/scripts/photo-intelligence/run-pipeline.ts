@@ -59,7 +59,7 @@ async function _checkPythonDependencies(pythonPath: string): Promise<boolean> {
   try {
     // Check core dependencies (mediapipe OR face_recognition for face detection)
     await execAsync(
-      `${pythonPath} -c "import ultralytics, sentence_transformers, imagehash, sklearn, mediapipe"`
+      `${pythonPath} -c "import ultralytics, sentence_transformers, scipy, mediapipe"`
     )
     // If command succeeds (exit code 0), dependencies are installed
     return true
@@ -67,7 +67,7 @@ async function _checkPythonDependencies(pythonPath: string): Promise<boolean> {
     // Try with face_recognition instead
     try {
       await execAsync(
-        `${pythonPath} -c "import ultralytics, sentence_transformers, imagehash, sklearn, face_recognition"`
+        `${pythonPath} -c "import ultralytics, sentence_transformers, scipy, face_recognition"`
       )
       return true
     } catch {
@@ -101,7 +101,7 @@ async function runPipeline(options: PipelineOptions): Promise<void> {
   console.log(`Using Python: ${pythonPath}`)
   try {
     const { stderr } = await execAsync(
-      `${pythonPath} -c "import ultralytics, sentence_transformers, imagehash, sklearn, mediapipe"`
+      `${pythonPath} -c "import ultralytics, sentence_transformers, scipy, mediapipe"`
     )
     if (stderr && !stderr.includes('Ultralytics')) {
       // Ultralytics prints to stderr but it's not an error
@@ -112,7 +112,7 @@ async function runPipeline(options: PipelineOptions): Promise<void> {
     // Try with face_recognition instead
     try {
       const { stderr } = await execAsync(
-        `${pythonPath} -c "import ultralytics, sentence_transformers, imagehash, sklearn, face_recognition"`
+        `${pythonPath} -c "import ultralytics, sentence_transformers, scipy, face_recognition"`
       )
       if (stderr && !stderr.includes('Ultralytics')) {
         console.warn('Warning:', stderr)
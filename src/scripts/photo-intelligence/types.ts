@@ -18,7 +18,10 @@ export interface PhotoIntelligenceResult {
     quality_score: number
   }>
   face_encodings: Array<{
-    embedding: number[]
+    // Base64 of little-endian float32 bytes
+    embedding_b64?: string
+    // Legacy/opt-in (--embedding-lists) plain float list
+    embedding?: number[]
     box: { x: number; y: number; width: number; height: number }
     confidence: number
     quality_score: number
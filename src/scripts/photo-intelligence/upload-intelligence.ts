@@ -46,6 +46,21 @@ interface UploadStats {
   errors: number
 }
 
+/**
+ * Get a face embedding as a float list, decoding the compact base64 form.
+ */
+function decodeFaceEmbedding(
+  faceEncoding: PhotoIntelligenceResult['face_encodings'][number]
+): number[] {
+  if (faceEncoding.embedding) return faceEncoding.embedding
+  const bytes = Buffer.from(faceEncoding.embedding_b64 ?? '', 'base64')
+  const embedding: number[] = []
+  for (let offset = 0; offset + 4 <= bytes.length; offset += 4) {
+    embedding.push(bytes.readFloatLE(offset))
+  }
+  return embedding
+}
+
 async function loadPipelineResults(outputDir: string): Promise<{
   photos: PhotoIntelligenceResult[]
   clusters: ClusterData | null
@@ -167,7 +182,7 @@ async function uploadPhotoIntelligence(
           ) VALUES (
             ${photoId}::uuid,
             ${JSON.stringify(faceEncoding.box)}::jsonb,
-            ${JSON.stringify(faceEncoding.embedding)}::jsonb,
+            ${JSON.stringify(decodeFaceEmbedding(faceEncoding))}::jsonb,
             ${faceEncoding.confidence},
             ${faceEncoding.quality_score}
           )